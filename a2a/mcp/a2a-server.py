@@ -17,9 +17,16 @@ Or via uv:    uv run -qs a2a-server.py
 # ///
 
 import asyncio
+import ctypes
+import functools
+import os
 import re
+import string
+import struct
+import sys
+import tempfile
 import time
-from datetime import datetime, timezone
+from dataclasses import dataclass
 from pathlib import Path
 
 import yaml
@@ -28,11 +35,59 @@ from mcp.server.fastmcp import FastMCP
 A2A_DIR = Path.home() / "a2a"
 AGENT_NAME_PATTERN = re.compile(r"^[a-zA-Z0-9_-]+$")
 
+# An active-agents.md section: a "## <name>" header line plus every following
+# line up to the next header or end of file.
+AGENT_SECTION_PATTERN = re.compile(
+    r"^## (?P<name>.*)$\n?(?P<body>(?:(?!## ).*\n?)*)", re.MULTILINE
+)
+AGENT_FIELD_PATTERN = re.compile(
+    r"^\*\*(Capabilities|Working in|Started):\*\* ?(.*)$", re.MULTILINE
+)
+BLANK_LINE_RUN_PATTERN = re.compile(r"\n{3,}")
+
+# bytes.translate tables for message filename slugs (applied to the already
+# lowercased subject): turn spaces into hyphens, keep lowercase ASCII letters,
+# digits and hyphens, drop everything else
+SLUG_TABLE = bytes.maketrans(b" ", b"-")
+SLUG_DELETE = bytes(
+    c for c in range(256) if chr(c) not in string.ascii_lowercase + string.digits + " -"
+)
+
+# inotify(7) constants. IN_CREATE is deliberately not watched: it fires before
+# the sender has written anything, whereas IN_CLOSE_WRITE/IN_MOVED_TO only fire
+# once the message is complete.
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+
+@dataclass
+class AgentRecord:
+    """One agent's section of ``active-agents.md``."""
+
+    description: str = ""
+    capabilities: str = ""
+    working_dir: str = ""
+    started: str = ""
+
+
+# (path, st_ino, st_mtime_ns, st_size, text, parsed sections) of the last read
+# of active-agents.md, so repeated tool calls only pay for a stat(). Rewrites
+# replace the file, so the inode tells apart same-size writes within one mtime
+# tick.
+_AGENTS_CACHE: tuple[Path, int, int, int, str, dict[str, AgentRecord]] | None = None
+
 mcp = FastMCP("a2a")
 
 
+@functools.lru_cache(maxsize=256)
 def _validate_agent_name(name: str) -> None:
-    """Validate agent name format."""
+    """Validate agent name format.
+
+    Cached since tools are called with the same few names over and over;
+    invalid names raise, and exceptions are never cached.
+    """
     if not AGENT_NAME_PATTERN.match(name):
         raise ValueError(
             f"Agent name '{name}' is invalid. "
@@ -40,14 +95,273 @@ def _validate_agent_name(name: str) -> None:
         )
 
 
-def _get_timestamp() -> str:
-    """Get ISO 8601 UTC timestamp."""
-    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+def _get_timestamp(now: time.struct_time | None = None) -> str:
+    """Get ISO 8601 UTC timestamp (of ``now`` if given)."""
+    return "{:04d}-{:02d}-{:02d}T{:02d}:{:02d}:{:02d}Z".format(
+        *(now or time.gmtime())[:6]
+    )
 
 
-def _get_filename_timestamp() -> str:
-    """Get filesystem-safe timestamp for filenames."""
-    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H-%M-%SZ")
+def _get_filename_timestamp(now: time.struct_time | None = None) -> str:
+    """Get filesystem-safe timestamp for filenames (of ``now`` if given)."""
+    return "{:04d}-{:02d}-{:02d}T{:02d}-{:02d}-{:02d}Z".format(
+        *(now or time.gmtime())[:6]
+    )
+
+
+def _atomic_write_bytes(path: Path, data: bytes) -> os.stat_result:
+    """Write ``data`` to ``path`` atomically.
+
+    The data goes to a hidden temporary sibling that is fsynced and then
+    ``os.replace``d into place, so readers never observe a partial file.
+    Returns the stat of the written file, taken before the replace so it
+    can't belong to a concurrent writer's file.
+    """
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False
+    ) as tmp:
+        try:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+            st = os.fstat(tmp.fileno())
+        except BaseException:
+            os.unlink(tmp.name)
+            raise
+    os.replace(tmp.name, path)
+    return st
+
+
+def _atomic_write(path: Path, content: str) -> os.stat_result:
+    """Write ``content`` to ``path`` atomically as UTF-8."""
+    return _atomic_write_bytes(path, content.encode("utf-8"))
+
+
+def _inotify_open(directory: Path) -> int | None:
+    """Open a non-blocking inotify fd watching ``directory`` for new files.
+
+    Returns None where inotify is unavailable, so callers can fall back to
+    periodic rescans.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = IN_CLOSE_WRITE | IN_MOVED_TO
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _inotify_read_names(fd: int) -> list[str] | None:
+    """Drain pending events from an inotify fd and return the reported names.
+
+    Returns None if the kernel event queue overflowed, meaning events were lost
+    and the caller must rescan the whole directory.
+    """
+    names: list[str] = []
+    while True:
+        try:
+            buf = os.read(fd, 65536)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(buf):
+            _wd, mask, _cookie, length = INOTIFY_EVENT.unpack_from(buf, offset)
+            offset += INOTIFY_EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.append(os.fsdecode(name))
+
+
+async def _wait_readable(fd: int, timeout: float) -> bool:
+    """Wait up to ``timeout`` seconds for ``fd`` to become readable."""
+    loop = asyncio.get_running_loop()
+    ready = loop.create_future()
+    loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+    try:
+        await asyncio.wait_for(ready, timeout)
+        return True
+    except TimeoutError:
+        return False
+    finally:
+        loop.remove_reader(fd)
+
+
+def _scan_inbox(inbox_dir: Path) -> tuple[list[str], set[str]]:
+    """List ``inbox_dir`` in one pass.
+
+    Returns the message filenames (in directory order) and the set of those
+    that have a ``.seen`` marker, so read state is a set lookup rather than a
+    stat per file.
+    """
+    messages: list[str] = []
+    seen: set[str] = set()
+    with os.scandir(inbox_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".md") and entry.is_file():
+                messages.append(entry.name)
+            elif entry.name.endswith(".md.seen"):
+                seen.add(entry.name.removesuffix(".seen"))
+    return messages, seen
+
+
+def _find_unread(inbox_dir: Path, names: list[str] | None = None) -> Path | None:
+    """Return the oldest (lowest-named) unread message in ``inbox_dir``.
+
+    If ``names`` is given, only those entries are considered instead of
+    rescanning the whole directory.
+    """
+    if names is None:
+        messages, seen = _scan_inbox(inbox_dir)
+        first = min((name for name in messages if name not in seen), default=None)
+        return None if first is None else inbox_dir / first
+
+    unread = (
+        msg_file
+        for msg_file in (inbox_dir / name for name in names if name.endswith(".md"))
+        if msg_file.exists() and not msg_file.with_suffix(".md.seen").exists()
+    )
+    return min(unread, default=None)
+
+
+async def _wait_for_unread(fd: int, inbox_dir: Path, timeout: float) -> Path | None:
+    """Wait up to ``timeout`` seconds for an unread message in ``inbox_dir``.
+
+    Blocks on the inotify ``fd``; only files named in its events are checked.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        names = _inotify_read_names(fd)
+        if names is None or names:
+            msg_file = _find_unread(inbox_dir, names)
+            if msg_file is not None:
+                return msg_file
+        remaining = deadline - loop.time()
+        if remaining <= 0 or not await _wait_readable(fd, remaining):
+            return None
+
+
+def _parse_agents(content: str) -> dict[str, AgentRecord]:
+    """Parse the ``## <name>`` sections of ``active-agents.md``."""
+    agents: dict[str, AgentRecord] = {}
+
+    for section in AGENT_SECTION_PATTERN.finditer(content):
+        body = section["body"]
+        fields = dict(AGENT_FIELD_PATTERN.findall(body))
+        # Description is typically 2 lines after header (after blank line)
+        description = body.partition("\n")[2].partition("\n")[0]
+        if description.startswith("**"):
+            description = ""
+        agents[section["name"]] = AgentRecord(
+            description=description,
+            capabilities=fields.get("Capabilities", ""),
+            working_dir=fields.get("Working in", ""),
+            started=fields.get("Started", ""),
+        )
+
+    return agents
+
+
+def _remove_agent_section(content: str, agent_name: str) -> str:
+    """Remove ``agent_name``'s section from the text of ``active-agents.md``."""
+    pattern = rf"^## {re.escape(agent_name)}$\n?(?:(?!## ).*\n?)*"
+    return re.sub(pattern, "", content, flags=re.MULTILINE)
+
+
+def _cache_agents(
+    agents_file: Path, st: os.stat_result, content: str
+) -> dict[str, AgentRecord]:
+    """Parse ``content`` and remember it as the state of ``agents_file`` at ``st``.
+
+    ``st`` must describe the very file ``content`` came from (an ``fstat`` of
+    it), never a later ``stat()`` of the path, which another server process
+    may have replaced in the meantime.
+    """
+    global _AGENTS_CACHE
+    agents = _parse_agents(content)
+    _AGENTS_CACHE = (
+        agents_file,
+        st.st_ino,
+        st.st_mtime_ns,
+        st.st_size,
+        content,
+        agents,
+    )
+    return agents
+
+
+def _load_agents(
+    agents_file: Path, force_refresh: bool = False
+) -> tuple[str, dict[str, AgentRecord]]:
+    """Return the text and parsed sections of ``agents_file``.
+
+    The file is only re-read when its inode, mtime or size differ from the
+    cached copy, so changes made by other server processes are still picked up.
+    """
+    st = agents_file.stat()
+    cache = _AGENTS_CACHE
+    if (
+        not force_refresh
+        and cache is not None
+        and cache[:4] == (agents_file, st.st_ino, st.st_mtime_ns, st.st_size)
+    ):
+        return cache[4], cache[5]
+
+    with open(agents_file, "rb") as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    content = data.decode("utf-8")
+    if len(data) != st.st_size:
+        # Appended to while we read; don't file this text under either size
+        return content, _parse_agents(content)
+    return content, _cache_agents(agents_file, st, content)
+
+
+def _write_agents(agents_file: Path, content: str) -> None:
+    """Write ``active-agents.md`` and refresh the cache from what was written."""
+    st = _atomic_write(agents_file, content)
+    _cache_agents(agents_file, st, content)
+
+
+def _append_agents(
+    agents_file: Path, content: str, agents: dict[str, AgentRecord], addition: str
+) -> None:
+    """Append ``addition`` to ``active-agents.md``.
+
+    ``content`` and ``agents`` are the file's current text and parsed sections;
+    the cache is extended with the new sections rather than re-read. If the
+    file doesn't end up exactly ``content + addition`` long, another server
+    process appended too, and the cache is dropped instead.
+    """
+    global _AGENTS_CACHE
+    with open(agents_file, "a", encoding="utf-8") as f:
+        f.write(addition)
+        f.flush()
+        st = os.fstat(f.fileno())
+    content += addition
+    if st.st_size != len(content.encode("utf-8")):
+        _AGENTS_CACHE = None
+        return
+    agents.update(_parse_agents(addition))
+    _AGENTS_CACHE = (
+        agents_file,
+        st.st_ino,
+        st.st_mtime_ns,
+        st.st_size,
+        content,
+        agents,
+    )
 
 
 @mcp.tool()
@@ -70,59 +384,31 @@ def register_agent(
 
     # Initialize active-agents.md if needed
     if not agents_file.exists():
-        agents_file.write_text("# Active Agents\n\n")
+        _atomic_write(agents_file, "# Active Agents\n\n")
 
-    content = agents_file.read_text()
+    content, agents = _load_agents(agents_file)
 
     # Check if agent already registered
-    agent_header = f"## {agent_name}"
     changes: list[str] = []
 
-    if agent_header in content:
-        # Extract and compare existing values
-        lines = content.split("\n")
-        in_section = False
-        existing_desc = ""
-        existing_caps = ""
-        existing_dir = ""
-
-        for i, line in enumerate(lines):
-            if line == agent_header:
-                in_section = True
-                # Description is typically 2 lines after header (after blank line)
-                if i + 2 < len(lines) and not lines[i + 2].startswith("**"):
-                    existing_desc = lines[i + 2]
-            elif in_section:
-                if line.startswith("## "):
-                    break
-                if line.startswith("**Capabilities:**"):
-                    existing_caps = line.replace("**Capabilities:** ", "")
-                elif line.startswith("**Working in:**"):
-                    existing_dir = line.replace("**Working in:** ", "")
-
-        if existing_desc != description:
-            changes.append(f"description: '{existing_desc}' -> '{description}'")
-        if existing_caps != capabilities:
-            changes.append(f"capabilities: '{existing_caps}' -> '{capabilities}'")
-        if existing_dir != working_dir:
-            changes.append(f"working-dir: '{existing_dir}' -> '{working_dir}'")
+    existing = agents.get(agent_name)
+    if existing is not None:
+        # Compare against existing values
+        if existing.description != description:
+            changes.append(f"description: '{existing.description}' -> '{description}'")
+        if existing.capabilities != capabilities:
+            changes.append(
+                f"capabilities: '{existing.capabilities}' -> '{capabilities}'"
+            )
+        if existing.working_dir != working_dir:
+            changes.append(f"working-dir: '{existing.working_dir}' -> '{working_dir}'")
+
+        if not changes:
+            # Leave the file (and its mtime, which keys every server's cache) alone
+            return f"Agent '{agent_name}' registration unchanged"
 
         # Remove existing entry
-        new_lines = []
-        skip = False
-        for line in lines:
-            if line == agent_header:
-                skip = True
-                continue
-            if skip and line.startswith("## "):
-                skip = False
-            if not skip:
-                new_lines.append(line)
-
-        # Clean up extra blank lines at end
-        while new_lines and new_lines[-1] == "":
-            new_lines.pop()
-        content = "\n".join(new_lines)
+        content = _remove_agent_section(content, agent_name)
 
     # Append new registration
     entry = f"""
@@ -136,8 +422,13 @@ def register_agent(
 **Started:** {timestamp}
 **Status:** active
 """
-    content = content.rstrip() + entry
-    agents_file.write_text(content)
+    stripped = content.rstrip()
+    trailing = content[len(stripped) :]
+    if existing is None and entry.startswith(trailing):
+        # New agent: append just the entry instead of rewriting the file
+        _append_agents(agents_file, content, agents, entry[len(trailing) :])
+    else:
+        _write_agents(agents_file, stripped + entry)
 
     if changes:
         changes_str = "\n".join(f"  - {c}" for c in changes)
@@ -155,41 +446,17 @@ def unregister_agent(agent_name: str, delete_inbox: bool = False) -> str:
     if not agents_file.exists():
         raise ValueError("No agents file found - nothing to unregister")
 
-    content = agents_file.read_text()
-    agent_header = f"## {agent_name}"
+    content, agents = _load_agents(agents_file)
 
-    if agent_header not in content:
+    if agent_name not in agents:
         raise ValueError(f"Agent '{agent_name}' is not registered")
 
     # Remove the agent's section
-    lines = content.split("\n")
-    new_lines = []
-    skip = False
+    content = _remove_agent_section(content, agent_name)
 
-    for line in lines:
-        if line == agent_header:
-            skip = True
-            continue
-        if skip and line.startswith("## "):
-            skip = False
-        if not skip:
-            new_lines.append(line)
-
-    # Clean up extra blank lines at end
-    while new_lines and new_lines[-1] == "":
-        new_lines.pop()
-
-    # Clean up multiple consecutive blank lines
-    cleaned_lines = []
-    prev_blank = False
-    for line in new_lines:
-        is_blank = line == ""
-        if is_blank and prev_blank:
-            continue
-        cleaned_lines.append(line)
-        prev_blank = is_blank
-
-    agents_file.write_text("\n".join(cleaned_lines) + "\n")
+    # Collapse runs of blank lines and drop trailing ones
+    content = BLANK_LINE_RUN_PATTERN.sub("\n\n", content).rstrip("\n") + "\n"
+    _write_agents(agents_file, content)
 
     result = f"Unregistered agent '{agent_name}'"
 
@@ -225,12 +492,18 @@ def send_message(
         warning = f"Warning: recipient '{to_agent}' may not be registered (inbox doesn't exist)\n"
         recipient_dir.mkdir(parents=True, exist_ok=True)
 
-    timestamp = _get_timestamp()
-    filename_timestamp = _get_filename_timestamp()
+    # Read the clock once so the header and filename timestamps agree
+    now = time.gmtime()
+    timestamp = _get_timestamp(now)
+    filename_timestamp = _get_filename_timestamp(now)
 
     # Create subject slug
-    subject_slug = subject.lower().replace(" ", "-")
-    subject_slug = re.sub(r"[^a-z0-9-]", "", subject_slug)[:50]
+    subject_slug = (
+        subject.lower()
+        .encode("ascii", "ignore")
+        .translate(SLUG_TABLE, SLUG_DELETE)[:50]
+        .decode()
+    )
 
     filename = f"{filename_timestamp}-{subject_slug}.md"
     filepath = recipient_dir / filename
@@ -249,7 +522,7 @@ def send_message(
         sort_keys=False,
     ).rstrip("\n")
     message_content = f"---\n{frontmatter}\n---\n\n{body}\n"
-    filepath.write_text(message_content)
+    _atomic_write_bytes(filepath, message_content.encode("utf-8"))
 
     return f"{warning}Sent message to {to_agent}: {filepath}"
 
@@ -281,26 +554,41 @@ async def poll_inbox(
         f"Poll started at {start_time}",
     ]
 
+    # Watch before the initial scan so nothing arriving in between is missed
+    watch_fd = _inotify_open(inbox_dir)
+
     try:
-        for i in range(1, max_iterations + 1):
-            # Check for unread messages
-            for msg_file in sorted(inbox_dir.glob("*.md")):
-                seen_file = msg_file.with_suffix(".md.seen")
-                if not seen_file.exists():
-                    content = msg_file.read_text()
-                    return "\n".join(
-                        [
-                            *result_lines,
-                            f"--- Found unread message (iteration {i}) ---",
-                            f"Path: {msg_file}",
-                            "--- Content ---",
-                            content,
-                        ]
-                    )
-
-            # Sleep unless last iteration (using async sleep for proper cancellation)
-            if i < max_iterations:
+        msg_file = _find_unread(inbox_dir)
+        i = 1
+        if watch_fd is not None:
+            if msg_file is None and max_iterations > 1:
+                # One wait covers every remaining iteration; report the
+                # iteration whose delay the message arrived in
+                started = time.monotonic()
+                msg_file = await _wait_for_unread(
+                    watch_fd, inbox_dir, delay_seconds * (max_iterations - 1)
+                )
+                waited = time.monotonic() - started
+                i = 2 + (int(waited // delay_seconds) if delay_seconds else 0)
+                i = min(i, max_iterations)
+        else:
+            while msg_file is None and i < max_iterations:
+                i += 1
+                # No inotify: sleep and rescan (async sleep for proper cancellation)
                 await asyncio.sleep(delay_seconds)
+                msg_file = _find_unread(inbox_dir)
+
+        if msg_file is not None:
+            content = msg_file.read_text(encoding="utf-8")
+            return "\n".join(
+                [
+                    *result_lines,
+                    f"--- Found unread message (iteration {i}) ---",
+                    f"Path: {msg_file}",
+                    "--- Content ---",
+                    content,
+                ]
+            )
 
     except asyncio.CancelledError:
         # Handle graceful cancellation - don't leave server in bad state
@@ -310,6 +598,9 @@ async def poll_inbox(
                 "Polling cancelled by client request",
             ]
         )
+    finally:
+        if watch_fd is not None:
+            os.close(watch_fd)
 
     return "\n".join(
         [
@@ -344,14 +635,15 @@ def mark_read(message_path: str) -> str:
 
 
 @mcp.tool()
-def list_agents() -> str:
+def list_agents(force_refresh: bool = False) -> str:
     """Use the a2a:a2a-communication skill first."""
     agents_file = A2A_DIR / "active-agents.md"
 
     if not agents_file.exists():
         return "No agents registered yet. Use register_agent to register an agent."
 
-    return agents_file.read_text()
+    content, _agents = _load_agents(agents_file, force_refresh=force_refresh)
+    return content
 
 
 @mcp.tool()
@@ -366,22 +658,22 @@ def list_inbox(agent_name: str, include_read: bool = False) -> str:
             f"Inbox directory not found: {inbox_dir}\nHave you registered this agent?"
         )
 
-    messages = sorted(inbox_dir.glob("*.md"))
+    messages, seen = _scan_inbox(inbox_dir)
+    messages.sort()
 
     if not messages:
         return f"No messages in inbox for {agent_name}"
 
     lines = [f"Inbox for {agent_name}:", ""]
 
-    for msg_file in messages:
-        seen_file = msg_file.with_suffix(".md.seen")
-        is_read = seen_file.exists()
+    for name in messages:
+        is_read = name in seen
 
         if is_read and not include_read:
             continue
 
         status = "[read]" if is_read else "[unread]"
-        lines.append(f"  {status} {msg_file.name}")
+        lines.append(f"  {status} {name}")
 
     if len(lines) == 2:
         return f"No {'unread ' if not include_read else ''}messages in inbox for {agent_name}"
@@ -14,11 +14,31 @@ import os
 import re
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import anthropic
 import git
 
+if TYPE_CHECKING:
+    # Imported lazily in main(): most runs find nothing to bump and never call Claude
+    import anthropic
+
+# POSIX ERE (as used by git's pickaxe) matching a JSON "version": "X.Y.Z" field
+VERSION_REGEX = r'"version"[[:space:]]*:[[:space:]]*"[0-9]+\.[0-9]+\.[0-9]+"'
+
+# Semantic version "X.Y.Z", matched against the whole version string
+SEMVER_REGEX = re.compile(r'([0-9]+)\.([0-9]+)\.([0-9]+)')
+
+# A whole diff line body consisting of nothing but a JSON "version" field
+VERSION_LINE_REGEX = re.compile(r'\s*"version"\s*:\s*"[^"]*"\s*,?\s*')
+
+# Extended diff header lines that mean a file change is more than its hunks
+STRUCTURAL_DIFF_HEADERS = (
+    "rename from", "copy from", "Binary files", "new file mode", "deleted file mode", "old mode"
+)
+
+# Total diff size sent to Claude, shared between plugins (Claude has token limits)
+MAX_DIFF_LENGTH = 50000
+
 
 def load_marketplace_config() -> dict:
     """Load marketplace.json to get list of plugins."""
@@ -36,9 +56,8 @@ def load_marketplace_config() -> dict:
         sys.exit(1)
 
 
-def get_plugins() -> list[dict]:
-    """Get list of plugins from marketplace config."""
-    config = load_marketplace_config()
+def get_plugins(config: dict) -> list[dict]:
+    """Get list of plugins from the loaded marketplace config."""
     plugins = config.get("plugins", [])
 
     print(f"📦 Found {len(plugins)} plugins:")
@@ -53,78 +72,92 @@ def get_plugins() -> list[dict]:
     return plugins
 
 
-def find_last_version_bump(repo: git.Repo, plugin_name: str) -> Optional[str]:
-    """Find the last commit that bumped this plugin's version.
+def find_last_version_bumps(repo: git.Repo, plugin_names: list[str]) -> dict[str, str]:
+    """Find the last commit that bumped each plugin's version.
 
-    Returns the commit SHA, or None if no version bump found.
+    History is walked once for all plugins: a single pickaxe ``git log`` over
+    marketplace.json and every plugin.json lists the files whose version lines
+    changed in each commit, and each plugin takes the newest commit touching
+    one of its files. The log is streamed and git is stopped as soon as every
+    plugin has a bump, so a run only walks back to the oldest of the latest
+    bumps (usually the previous marketplace.json bump). There is deliberately
+    no count or date cap: a cap could miss an old bump and make a plugin look
+    like it was never released.
+
+    Returns a mapping of plugin name to commit SHA. Plugins with no version
+    bump found are absent.
     """
-    # Files to check for version changes
-    files_to_check = [
-        ".claude-plugin/marketplace.json",
-        f"{plugin_name}/.claude-plugin/plugin.json"
-    ]
+    marketplace_file = ".claude-plugin/marketplace.json"
+    plugin_files = {f"{name}/.claude-plugin/plugin.json": name for name in plugin_names}
 
-    # Get commit history for these files
+    # Pickaxe drops non-matching files from each commit, so every listed path
+    # really changed a version line
+    bumps: dict[str, str] = {}
     try:
-        commits = list(repo.iter_commits(paths=files_to_check, max_count=100))
-    except git.GitCommandError:
-        return None
+        proc = repo.git.log(
+            "-G", VERSION_REGEX, "--name-only", "--format=%x00%H",
+            "--", marketplace_file, *plugin_files, as_process=True
+        )
+        sha = None
+        for line in proc.stdout:
+            path = line.decode('utf-8', errors='ignore').rstrip("\n")
+            if path.startswith("\x00"):
+                sha = path[1:]
+                continue
+            if path == marketplace_file:
+                owners = plugin_names
+            elif path in plugin_files:
+                owners = [plugin_files[path]]
+            else:
+                continue
+            for name in owners:
+                bumps.setdefault(name, sha)
+            if len(bumps) == len(plugin_files):
+                break
 
-    # Check each commit to see if it actually changed the version
-    for commit in commits:
-        try:
-            # Check the diff for this commit
-            if commit.parents:
-                parent = commit.parents[0]
-                diffs = parent.diff(commit, paths=files_to_check, create_patch=True)
-
-                for diff in diffs:
-                    # Look for version field changes in the patch
-                    if diff.diff:
-                        # Match actual JSON version field changes like: "version": "0.1.0"
-                        # This requires the pattern to appear on changed lines (+ or - in diff)
-                        version_pattern = rb'[+-].*"version"\s*:\s*"[0-9]+\.[0-9]+\.[0-9]+"'
-                        if re.search(version_pattern, diff.diff):
-                            return commit.hexsha
-        except (IndexError, git.GitCommandError):
-            continue
+        if len(bumps) == len(plugin_files):
+            proc.terminate()  # The rest of history can't change the answer
+        else:
+            proc.wait()  # Raises GitCommandError if git failed
+    except git.GitCommandError:
+        return {}
 
-    return None
+    return bumps
 
 
-def has_changes_since(repo: git.Repo, plugin_name: str, since_commit: Optional[str]) -> bool:
-    """Check if plugin directory has changes since the given commit.
+def find_changed_plugins(
+    repo: git.Repo, plugin_names: list[str], since_commit: Optional[str]
+) -> set[str]:
+    """Return which of the given plugins have changes since since_commit.
 
-    If since_commit is None, checks against repo root.
+    One git invocation answers for every plugin sharing the same baseline.
+    If since_commit is None, a plugin counts as changed if any commit touches it.
     """
-    plugin_path = plugin_name
-
-    if since_commit is None:
-        # No previous version bump, check if there are any commits for this plugin
-        try:
-            commits = list(repo.iter_commits(paths=plugin_path, max_count=1))
-            return len(commits) > 0
-        except git.GitCommandError:
-            return False
-
-    # Compare since_commit to HEAD
     try:
-        since = repo.commit(since_commit)
-        head = repo.head.commit
+        if since_commit is None:
+            # rev-list stops at the first commit touching each plugin, rather
+            # than listing the files of every commit in history
+            return {
+                name for name in plugin_names
+                if int(repo.git.rev_list("--count", "-n", "1", "HEAD", "--", name)) > 0
+            }
+        output = repo.git.diff("--name-only", since_commit, "HEAD", "--", *plugin_names)
+    except git.GitCommandError:
+        return set()
 
-        if since == head:
-            # Already at the version bump commit
-            return False
+    changed_dirs = {path.split("/", 1)[0] for path in output.splitlines() if path}
+    return changed_dirs & set(plugin_names)
 
-        # Check for differences
-        diffs = since.diff(head, paths=plugin_path)
-        return len(diffs) > 0
-    except (git.GitCommandError, git.BadName):
-        return False
 
+def get_changes_context(
+    repo: git.Repo, plugin_name: str, since_commit: Optional[str], max_diff_length: int
+) -> dict:
+    """Get commit messages and diff for changes since the given commit.
 
-def get_changes_context(repo: git.Repo, plugin_name: str, since_commit: Optional[str]) -> dict:
-    """Get commit messages and diff for changes since the given commit."""
+    At most max_diff_length bytes of diff are read from git and decoded. A
+    plugin that has never been bumped gets a file listing instead of a patch
+    of its entire contents.
+    """
     plugin_path = plugin_name
 
     if since_commit is None:
@@ -136,34 +169,47 @@ def get_changes_context(repo: git.Repo, plugin_name: str, since_commit: Optional
     # Get commit messages
     commit_messages = []
     try:
-        if since_ref:
-            commits = list(repo.iter_commits(f"{since_ref}..HEAD", paths=plugin_path))
-        else:
-            commits = list(repo.iter_commits("HEAD", paths=plugin_path))
+        rev = f"{since_ref}..HEAD" if since_ref else "HEAD"
 
-        commit_messages = [f"- {c.summary}" for c in reversed(commits)]
+        # Oldest first, straight from rev-list --reverse
+        commits = repo.iter_commits(rev, paths=plugin_path, reverse=True)
+        commit_messages = [f"- {c.summary}" for c in commits]
     except git.GitCommandError:
         commit_messages = []
 
-    # Get diff
     diff_text = ""
-    try:
-        if since_ref:
-            since = repo.commit(since_ref)
-            head = repo.head.commit
-            diffs = since.diff(head, paths=plugin_path, create_patch=True)
-        else:
-            # Get diff from empty tree
-            diffs = repo.head.commit.diff(git.NULL_TREE, paths=plugin_path, create_patch=True)
-
-        diff_parts = []
-        for diff in diffs:
-            if diff.diff:
-                diff_parts.append(diff.diff.decode('utf-8', errors='ignore'))
+    if not since_ref:
+        # Everything is new; the file names say more than a full patch would
+        try:
+            files = repo.git.ls_tree("-r", "--name-only", "HEAD", "--", plugin_path)
+        except git.GitCommandError:
+            files = ""
 
-        diff_text = "\n".join(diff_parts)
-    except (git.GitCommandError, git.BadName):
-        diff_text = ""
+        if files:
+            diff_text = "Initial release. Files:\n" + files
+            if len(diff_text) > max_diff_length:
+                diff_text = diff_text[:max_diff_length] + "\n\n[... diff truncated ...]"
+    else:
+        # Get diff as one patch stream from a single git process
+        try:
+            # Stream the diff and read one byte past the budget, so git never has
+            # to produce (and we never buffer) more than will be sent to Claude
+            # --no-color: a color.ui=always config would otherwise fill the
+            # text (and the byte budget) with ANSI escapes
+            proc = repo.git.diff(
+                "--no-color", since_ref, "HEAD", "--", plugin_path, as_process=True
+            )
+            diff_bytes = proc.stdout.read(max_diff_length + 1)
+
+            if len(diff_bytes) > max_diff_length:
+                proc.terminate()
+                diff_text = diff_bytes[:max_diff_length].decode('utf-8', errors='ignore')
+                diff_text += "\n\n[... diff truncated ...]"
+            else:
+                proc.wait()  # Raises GitCommandError if git failed
+                diff_text = diff_bytes.decode('utf-8', errors='ignore').rstrip('\n')
+        except git.GitCommandError:
+            diff_text = ""
 
     return {
         "commit_messages": "\n".join(commit_messages) if commit_messages else "(no commits)",
@@ -171,16 +217,116 @@ def get_changes_context(repo: git.Repo, plugin_name: str, since_commit: Optional
     }
 
 
+def classify_changed_paths(
+    repo: git.Repo, plugin_name: str, since_commit: Optional[str]
+) -> Optional[str]:
+    """Decide a bump type from the changed file set alone, when it is obvious.
+
+    - a skill, command or agent removed or renamed, or the plugin's MCP server
+      or hooks config (.mcp.json, hooks/hooks.json) deleted: major
+    - a new skill, command or agent added: minor
+    - only documentation (anything under docs/, or a top-level README,
+      CHANGELOG or CONTRIBUTING file): patch
+
+    Skills, commands and agents are markdown too, so markdown alone never
+    counts as documentation. Other deletions (a Dockerfile, LICENSE, a helper
+    script) are not assumed to be breaking. Returns None when no rule applies
+    (or there is no baseline), leaving the decision to Claude.
+    """
+    if since_commit is None:
+        return None
+
+    try:
+        name_status = repo.git.diff(
+            "--name-status", "-M", since_commit, "HEAD", "--", plugin_name
+        )
+    except git.GitCommandError:
+        return None
+
+    prefix = f"{plugin_name}/"
+    removed = []
+    added = []
+    changed = []
+    for line in name_status.splitlines():
+        status, *paths = line.split("\t")
+        paths = [path.removeprefix(prefix) for path in paths]
+        if status.startswith("R"):
+            removed.append(paths[0])
+            added.append(paths[1])
+        elif status == "D":
+            removed.append(paths[0])
+        elif status == "A":
+            added.append(paths[0])
+        changed.extend(paths)
+
+    def is_user_facing(path: str) -> bool:
+        # Skills, slash commands and subagents are what users invoke by name
+        if path.startswith("skills/"):
+            return path.endswith("/SKILL.md")
+        return path.startswith(("commands/", "agents/")) and path.endswith(".md")
+
+    def is_interface(path: str) -> bool:
+        # Config that declares the plugin's MCP tools and hooks
+        return path in (".mcp.json", "hooks/hooks.json")
+
+    def is_doc(path: str) -> bool:
+        if path.startswith("docs/"):
+            return True
+        stem = path.split(".", 1)[0].upper()
+        return "/" not in path and stem in ("README", "CHANGELOG", "CONTRIBUTING")
+
+    if any(is_user_facing(path) or is_interface(path) for path in removed):
+        return "major"
+    if any(is_user_facing(path) for path in added):
+        return "minor"
+    if changed and all(is_doc(path) for path in changed):
+        return "patch"
+    return None
+
+
 def parse_version(version: str) -> tuple[int, int, int]:
     """Parse semantic version string into (major, minor, patch)."""
-    parts = version.split('.')
-    if len(parts) != 3:
+    match = SEMVER_REGEX.fullmatch(version)
+    if not match:
         raise ValueError(f"Invalid version format: {version}")
 
-    try:
-        return (int(parts[0]), int(parts[1]), int(parts[2]))
-    except ValueError:
-        raise ValueError(f"Invalid version format: {version}")
+    major, minor, patch = map(int, match.groups())
+    return (major, minor, patch)
+
+
+def is_version_only_change(diff: str) -> bool:
+    """Check whether a diff only touches version fields and whitespace.
+
+    Such changes (e.g. a hand-edited version) are not worth asking Claude
+    about. A truncated or empty diff is never considered version-only, and
+    neither is any file change without a text hunk to inspect (renames,
+    binary files, mode changes, added or deleted files).
+    """
+    if diff.endswith("[... diff truncated ...]"):
+        return False
+
+    has_file = False
+    has_hunk = False
+    in_header = False
+    for line in diff.splitlines():
+        if line.startswith("diff --git "):
+            if has_file and not has_hunk:
+                return False
+            has_file = True
+            has_hunk = False
+            in_header = True
+        elif in_header:
+            if line.startswith("@@"):
+                in_header = False
+                has_hunk = True
+            elif line.startswith(STRUCTURAL_DIFF_HEADERS):
+                return False
+        elif line[:1] not in ("+", "-"):
+            continue
+        elif line[1:].strip() and not VERSION_LINE_REGEX.fullmatch(line[1:]):
+            return False
+
+    return has_file and has_hunk
 
 
 def bump_version(current: str, bump_type: str) -> str:
@@ -207,65 +353,90 @@ def bump_version(current: str, bump_type: str) -> str:
 
 
 def analyze_changes_with_claude(
-    client: anthropic.Anthropic,
-    plugin_name: str,
-    current_version: str,
-    changes_context: dict
-) -> str:
-    """Use Claude to analyze changes and determine bump type.
-
-    Returns: "major", "minor", or "patch"
-    """
-    commit_messages = changes_context["commit_messages"]
-    diff = changes_context["diff"]
+    client: "anthropic.Anthropic",
+    plugins: list[dict]
+) -> dict[str, str]:
+    """Use Claude to analyze changes and determine bump types.
 
-    # Truncate diff if too long (Claude has token limits)
-    max_diff_length = 50000
-    if len(diff) > max_diff_length:
-        diff = diff[:max_diff_length] + "\n\n[... diff truncated ...]"
+    All plugins are analyzed in a single request to pay the API round trip
+    once. Each entry in plugins has "name", "current_version" and "changes"
+    (as returned by get_changes_context, already truncated).
 
-    prompt = f"""Analyze these changes to the "{plugin_name}" Claude Code plugin and determine the appropriate semantic version bump.
+    Returns: mapping of plugin name to "major", "minor", or "patch"
+    """
+    sections = []
+    for plugin in plugins:
+        sections.append(f"""## Plugin "{plugin['name']}"
 
-Current version: {current_version}
+Current version: {plugin['current_version']}
 
 Commit messages since last bump:
-{commit_messages}
+{plugin['changes']['commit_messages']}
 
 Full diff:
-{diff}
+{plugin['changes']['diff']}""")
 
-Context: This is a Claude Code plugin consisting primarily of skills (prompt templates) and documentation for Claude.
+    plugin_sections = "\n\n".join(sections)
+    prompt = f"""Analyze these changes to Claude Code plugins and determine the appropriate semantic version bump for each plugin.
 
-Respond with ONLY one word: "patch", "minor", or "major"
+{plugin_sections}
+
+Context: Each plugin consists primarily of skills (prompt templates) and documentation for Claude.
+
+Respond with ONLY a JSON object mapping each plugin name to "patch", "minor", or "major", e.g. {{"example-plugin": "patch"}}
 - patch: Bug fixes, typo corrections, small refinements
 - minor: New features, significant improvements (default if uncertain)
 - major: Breaking changes, incompatible modifications
 
-Version bump type:"""
+Version bump types:"""
 
     try:
         response = client.messages.create(
             model="claude-haiku-4-5",
-            max_tokens=10,
+            max_tokens=20 + 20 * len(plugins),
+            temperature=0,
+            # Nothing useful follows the JSON object; stop as soon as it closes
+            stop_sequences=["}"],
             messages=[{"role": "user", "content": prompt}]
         )
 
-        bump_type = response.content[0].text.strip().lower()
+        # An empty reply has no content blocks at all
+        text = response.content[0].text
+        if response.stop_reason == "stop_sequence":
+            text += "}"
+    except Exception as e:
+        print(f"  ⚠️  Claude API error: {e}, defaulting to 'minor'")
+        return {plugin["name"]: "minor" for plugin in plugins}
+
+    try:
+        answer = json.loads(text[text.find("{"):text.rfind("}") + 1])
+    except json.JSONDecodeError:
+        answer = None
+    if not isinstance(answer, dict):
+        print(f"  ⚠️  Claude returned unparseable response {text!r}, defaulting to 'minor'")
+        answer = {}
+
+    bump_types = {}
+    for plugin in plugins:
+        bump_type = str(answer.get(plugin["name"], "")).strip().lower()
 
         # Validate response
         if bump_type not in ["patch", "minor", "major"]:
-            print(f"  ⚠️  Claude returned unexpected value '{bump_type}', defaulting to 'minor'")
-            return "minor"
+            if answer:
+                print(f"  ⚠️  Claude returned unexpected value '{bump_type}' for {plugin['name']}, defaulting to 'minor'")
+            bump_type = "minor"
 
-        return bump_type
-    except Exception as e:
-        print(f"  ⚠️  Claude API error: {e}, defaulting to 'minor'")
-        return "minor"
+        bump_types[plugin["name"]] = bump_type
+
+    return bump_types
 
 
-def update_plugin_versions(bump_plan: list[dict]) -> list[str]:
+def update_plugin_versions(bump_plan: list[dict], marketplace_data: dict) -> list[str]:
     """Update version fields in plugin.json and marketplace.json.
 
+    marketplace_data is the config already loaded by main(), so marketplace.json
+    is read only once per run.
+
     Returns list of modified file paths.
     """
     modified_files = []
@@ -292,9 +463,6 @@ def update_plugin_versions(bump_plan: list[dict]) -> list[str]:
     # Update marketplace.json
     marketplace_path = Path(".claude-plugin/marketplace.json")
 
-    with open(marketplace_path) as f:
-        marketplace_data = json.load(f)
-
     # Update versions for each plugin
     for plan in bump_plan:
         for plugin in marketplace_data.get("plugins", []):
@@ -382,7 +550,9 @@ def main() -> int:
 
     # Initialize git repo
     try:
-        repo = git.Repo(".")
+        # Object reads (e.g. commit summaries) go through one persistent
+        # `git cat-file --batch` process rather than a spawn per object
+        repo = git.Repo(".", odbt=git.GitCmdObjectDB)
     except git.InvalidGitRepositoryError:
         print("❌ Error: Not a git repository")
         return 1
@@ -390,15 +560,27 @@ def main() -> int:
     print("✓ Environment validated")
 
     # Load plugins
-    plugins = get_plugins()
+    marketplace_data = load_marketplace_config()
+    plugins = get_plugins(marketplace_data)
 
     # Find plugins that need version bumps
     print("\n🔎 Finding last version bumps...")
     plugins_to_bump = []
 
+    bumps = find_last_version_bumps(repo, [plugin["name"] for plugin in plugins])
+
+    # Plugins sharing a baseline commit (e.g. bumped together) are checked together
+    plugins_by_baseline: dict[Optional[str], list[str]] = {}
+    for plugin in plugins:
+        plugins_by_baseline.setdefault(bumps.get(plugin["name"]), []).append(plugin["name"])
+
+    changed_plugins: set[str] = set()
+    for since_commit, plugin_names in plugins_by_baseline.items():
+        changed_plugins |= find_changed_plugins(repo, plugin_names, since_commit)
+
     for plugin in plugins:
-        last_bump = find_last_version_bump(repo, plugin["name"])
-        has_changes = has_changes_since(repo, plugin["name"], last_bump)
+        last_bump = bumps.get(plugin["name"])
+        has_changes = plugin["name"] in changed_plugins
 
         if last_bump:
             print(f"  - {plugin['name']}: last bump at {last_bump[:8]}, changes: {has_changes}")
@@ -418,30 +600,62 @@ def main() -> int:
     print(f"\n📝 {len(plugins_to_bump)} plugin(s) need version bumps")
 
     # Analyze each plugin with Claude
-    client = anthropic.Anthropic(api_key=api_key)
     bump_plan = []
 
     print("\n🤖 Analyzing changes with Claude...")
+
+    # Obvious cases are decided from the changed file names alone
+    bump_types = {}
+    needs_context = []
     for item in plugins_to_bump:
+        plugin_name = item["plugin"]["name"]
+        bump_type = classify_changed_paths(repo, plugin_name, item["last_bump"])
+        if bump_type:
+            print(f"  {plugin_name}: changed files imply '{bump_type}'")
+            bump_types[plugin_name] = bump_type
+        else:
+            needs_context.append(item)
+
+    analyses = []
+    max_diff_length = MAX_DIFF_LENGTH // max(len(needs_context), 1)
+    for item in needs_context:
         plugin = item["plugin"]
-        plugin_name = plugin["name"]
-        current_version = plugin["version"]
+        print(f"  Collecting changes for {plugin['name']}...")
+
+        analyses.append({
+            "name": plugin["name"],
+            "current_version": plugin["version"],
+            "changes": get_changes_context(
+                repo, plugin["name"], item["last_bump"], max_diff_length
+            )
+        })
 
-        print(f"\n  Analyzing {plugin_name}...")
+    # Trivial changes don't need Claude
+    needs_claude = []
+    for item, analysis in zip(needs_context, analyses):
+        if item["last_bump"] and is_version_only_change(analysis["changes"]["diff"]):
+            print(f"  {analysis['name']}: only version/whitespace changes, using 'patch'")
+            bump_types[analysis["name"]] = "patch"
+        else:
+            needs_claude.append(analysis)
 
-        # Get changes context
-        changes = get_changes_context(repo, plugin_name, item["last_bump"])
+    # Ask Claude about every remaining plugin at once
+    if needs_claude:
+        import anthropic
 
-        # Ask Claude
-        bump_type = analyze_changes_with_claude(client, plugin_name, current_version, changes)
-        new_version = bump_version(current_version, bump_type)
+        client = anthropic.Anthropic(api_key=api_key)
+        bump_types.update(analyze_changes_with_claude(client, needs_claude))
 
-        print(f"    {current_version} → {new_version} ({bump_type})")
+    for item in plugins_to_bump:
+        plugin = item["plugin"]
+        plugin_name = plugin["name"]
+        current_version = plugin["version"]
+        bump_type = bump_types[plugin_name]
 
         bump_plan.append({
             "plugin_name": plugin_name,
             "current_version": current_version,
-            "new_version": new_version,
+            "new_version": bump_version(current_version, bump_type),
             "bump_type": bump_type,
             "plugin_dir": plugin["source"]
         })
@@ -453,7 +667,7 @@ def main() -> int:
 
     # Update JSON files
     print("\n📝 Updating version files...")
-    modified_files = update_plugin_versions(bump_plan)
+    modified_files = update_plugin_versions(bump_plan, marketplace_data)
 
     # Create commit
     create_bump_commit(repo, bump_plan, modified_files)